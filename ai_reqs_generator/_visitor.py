@@ -0,0 +1,115 @@
+"""
+Import scanning for source code. This module is the per-file hot path and is
+kept strictly typed so it can be compiled with mypyc (see setup.py); the plain
+Python version is used whenever no compiled build is installed.
+"""
+import ast
+import io
+import sys
+import tokenize
+from typing import Dict, Final, FrozenSet, List, Optional, Tuple, Type
+
+_NAME: Final = tokenize.NAME
+_OP: Final = tokenize.OP
+_NEWLINE: Final = tokenize.NEWLINE
+_INDENT: Final = tokenize.INDENT
+_DEDENT: Final = tokenize.DEDENT
+_SKIPPED_TOKENS: Final = frozenset((tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER))
+
+# Imports are statements, so only fields holding statement lists can contain them.
+_BLOCK_FIELDS: Final[FrozenSet[str]] = frozenset(('body', 'orelse', 'handlers', 'finalbody', 'cases'))
+_block_fields_cache: Dict[Type[ast.AST], Tuple[str, ...]] = {}
+
+def _block_fields(node_type: Type[ast.AST]) -> Tuple[str, ...]:
+    fields = _block_fields_cache.get(node_type)
+    if fields is None:
+        fields = tuple(field for field in node_type._fields if field in _BLOCK_FIELDS)
+        _block_fields_cache[node_type] = fields
+    return fields
+
+class ImportVisitor:
+    __slots__ = ('imports',)
+
+    def __init__(self) -> None:
+        self.imports: List[str] = []
+
+    def visit(self, tree: ast.AST) -> None:
+        # Walk statement lists only, with an explicit stack instead of recursion.
+        # Expressions are never entered; nested blocks (if/try/with, and function
+        # or class bodies, which hold lazy imports) still are.
+        pending: List[ast.AST] = [tree]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, ast.Import):
+                self.visit_Import(node)
+            elif isinstance(node, ast.ImportFrom):
+                self.visit_ImportFrom(node)
+            else:
+                for field in _block_fields(type(node)):
+                    pending.extend(getattr(node, field))
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append(sys.intern(alias.name.split('.', 1)[0]))
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module and not node.level:
+            self.imports.append(sys.intern(node.module.split('.', 1)[0]))
+
+def scan_imports(code: str) -> List[str]:
+    """
+    Collects import names straight from the token stream, without building an AST.
+    Relative imports are skipped since they always refer to local modules. Names
+    are interned, as the same few modules recur across thousands of files.
+    """
+    imports: List[str] = []
+    state: Optional[str] = None
+    at_statement_start = True
+    relative = False
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        tok_type: int = token[0]
+        tok_string: str = token[1]
+        if tok_type in _SKIPPED_TOKENS:
+            continue
+        if tok_type == _NEWLINE or (tok_type == _OP and tok_string == ';'):
+            state = None
+            at_statement_start = True
+        elif tok_type == _INDENT or tok_type == _DEDENT:
+            at_statement_start = True
+        elif state is None:
+            if at_statement_start and tok_type == _NAME and tok_string in ('import', 'from'):
+                state = tok_string
+                relative = False
+            # A ':' can open a one-line block, e.g. "try: import foo".
+            at_statement_start = tok_type == _OP and tok_string == ':'
+        elif state == 'import':
+            if tok_type == _NAME:
+                imports.append(sys.intern(tok_string))
+                state = 'import_rest'
+        elif state == 'import_rest':
+            # Skip the rest of a dotted name and any "as" alias.
+            if tok_type == _OP and tok_string == ',':
+                state = 'import'
+        elif state == 'from':
+            if tok_type == _OP and tok_string in ('.', '...'):
+                relative = True
+            elif tok_type == _NAME:
+                if tok_string != 'import' and not relative:
+                    imports.append(sys.intern(tok_string))
+                state = 'skip'
+    return imports
+
+def get_imports_from_code(code: str) -> List[str]:
+    try:
+        tree = compile(code, '<unknown>', 'exec', ast.PyCF_ONLY_AST)
+    except SyntaxError as e:
+        # Code that does not parse (e.g. notebook cells with IPython magics) may
+        # still tokenize, so fall back to scanning the token stream.
+        try:
+            return scan_imports(code)
+        except (tokenize.TokenError, SyntaxError):
+            print(f"Warning: Skipping a code block due to syntax error: {e}", file=sys.stderr)
+            return []
+    visitor = ImportVisitor()
+    visitor.visit(tree)
+    return visitor.imports
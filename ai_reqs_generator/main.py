@@ -1,76 +1,146 @@
 import os
 import json
-import ast
 import sys
+import inspect
 import argparse
 from importlib import metadata
 import urllib.request
 import urllib.error
 import re
+import hashlib
+import asyncio
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from ._visitor import get_imports_from_code
 from .standard_libraries import STANDARD_LIBRARIES
 
+# Directories that never hold project sources and are not worth scanning.
+# Virtualenvs under other names are recognized by their pyvenv.cfg instead.
+SKIPPED_DIRS = frozenset({
+    'venv', 'env', '.venv', '.git', '.ipynb_checkpoints', '__pycache__',
+    'node_modules', '.tox', '.nox', '.mypy_cache', 'site-packages',
+})
+
+# Directories a virtualenv creates inside its own root.
+VENV_DIRS = frozenset({'lib', 'lib64', 'Lib', 'bin', 'Scripts', 'include', 'Include'})
+
+# Cheap check for files that cannot contain an import statement at all.
+# Also matches one-line blocks such as "try: import foo" or "x = 1; import foo".
+_IMPORT_RE = re.compile(rb'(?m)(?:^|[:;])[ \t]*(?:import|from)[ \t.]')
+
+# --- JSON ---
+
+def json_loads(data):
+    """Decodes JSON from str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj):
+    """Encodes an object as UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
 # --- LLM Integration ---
 
+# Import names sent per request; batches are resolved concurrently.
+LLM_BATCH_SIZE = 20
+LLM_TIMEOUT = 30
+# Upper bound on concurrent API connections; with HTTP/2 batches share just one.
+LLM_MAX_CONNECTIONS = 4
+
+_JSON_DECODER = json.JSONDecoder()
+
+def _find_json_object(text):
+    """
+    Decodes the first JSON object in text. Returns (obj, start, end), or None if
+    there is no valid object.
+    """
+    # Prefer the object inside a ```json fence, but fall back to the whole text.
+    fence = text.find('```json')
+    start = text.find('{', fence) if fence != -1 else -1
+    if start == -1:
+        start = text.find('{')
+    while start != -1:
+        try:
+            obj, end = _JSON_DECODER.raw_decode(text, start)
+            return obj, start, end
+        except json.JSONDecodeError:
+            start = text.find('{', start + 1)
+    return None
+
+def extract_json_object(text):
+    """
+    Finds and decodes a JSON object from a string that might contain other text,
+    like markdown code fences. Returns None if there is none.
+    """
+    found = _find_json_object(text)
+    return found[0] if found else None
+
 def extract_json_from_string(text):
     """
     Finds and extracts a JSON object from a string that might contain other text,
     like markdown code fences.
     """
-    match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if match:
-        return match.group(1)
-    try:
-        start = text.index('{')
-        end = text.rindex('}') + 1
-        return text[start:end]
-    except ValueError:
-        return None
+    found = _find_json_object(text)
+    return text[found[1]:found[2]] if found else None
 
-def resolve_imports_with_llm(modules_to_resolve, api_key):
-    """
-    Uses the Gemini API to find the pip package names for a list of import names.
-    """
-    if not api_key:
-        print("\nWarning: No API key provided. Skipping AI resolution.", file=sys.stderr)
-        return {}
-        
-    print(f"\nAttempting to resolve {len(modules_to_resolve)} modules with AI: {', '.join(modules_to_resolve)}")
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    
+def build_llm_request(modules):
     prompt = (
         "You are an expert Python developer. For each Python import name in the following list, "
         "provide the corresponding official package name that is used for 'pip install'. "
         "Your response must be a single, valid JSON object where keys are the import names "
         "and values are the package names. If a package name cannot be found for an import, "
-        f"use a null value. The list of import names is: {list(modules_to_resolve)}"
+        f"use a null value. The list of import names is: {modules}"
     )
     payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(api_url, data=data, headers={'Content-Type': 'application/json'})
+    return json_dumps(payload)
 
+def parse_llm_response(result):
+    """
+    Pulls the import -> package mapping out of a Gemini generateContent response.
+    """
+    if (result.get('candidates') and result['candidates'][0].get('content') and 
+        result['candidates'][0]['content'].get('parts') and 
+        result['candidates'][0]['content']['parts'][0].get('text')):
+        
+        content_text = result['candidates'][0]['content']['parts'][0]['text']
+        llm_mappings = extract_json_object(content_text)
+        
+        if llm_mappings is not None:
+            return llm_mappings
+        else:
+            print("AI Warning: Could not find a valid JSON object in the response.", file=sys.stderr)
+            return {}
+    else:
+        print("AI Warning: Response format was unexpected.", file=sys.stderr)
+        return {}
+
+def resolve_batch(api_url, modules):
+    """Resolves one batch of modules with a blocking urllib request."""
+    req = urllib.request.Request(api_url, data=build_llm_request(modules), headers={'Content-Type': 'application/json'})
     try:
-        with urllib.request.urlopen(req) as response:
-            response_body = response.read().decode('utf-8')
-            result = json.loads(response_body)
-            
-            if (result.get('candidates') and result['candidates'][0].get('content') and 
-                result['candidates'][0]['content'].get('parts') and 
-                result['candidates'][0]['content']['parts'][0].get('text')):
-                
-                content_text = result['candidates'][0]['content']['parts'][0]['text']
-                json_string = extract_json_from_string(content_text)
-                
-                if json_string:
-                    llm_mappings = json.loads(json_string)
-                    print("AI resolution successful.")
-                    return llm_mappings
-                else:
-                    print("AI Warning: Could not find a valid JSON object in the response.", file=sys.stderr)
-                    return {}
-            else:
-                print("AI Warning: Response format was unexpected.", file=sys.stderr)
-                return {}
+        with urllib.request.urlopen(req, timeout=LLM_TIMEOUT) as response:
+            return parse_llm_response(json_loads(response.read()))
     except urllib.error.HTTPError as e:
         print(f"AI Error: HTTP Error {e.code}. Check your API key and permissions.", file=sys.stderr)
         return {}
@@ -84,85 +154,335 @@ def resolve_imports_with_llm(modules_to_resolve, api_key):
         print(f"An unexpected error occurred during AI resolution: {e}", file=sys.stderr)
         return {}
 
-# --- Core Logic ---
+async def resolve_batch_async(client, api_url, modules):
+    """Resolves one batch of modules over a shared httpx.AsyncClient."""
+    try:
+        response = await client.post(api_url, content=build_llm_request(modules), headers={'Content-Type': 'application/json'})
+        response.raise_for_status()
+        return parse_llm_response(json_loads(response.content))
+    except httpx.HTTPStatusError as e:
+        print(f"AI Error: HTTP Error {e.response.status_code}. Check your API key and permissions.", file=sys.stderr)
+        return {}
+    except httpx.RequestError as e:
+        print(f"AI Error: Could not connect to the API. {e}", file=sys.stderr)
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"AI Error: Could not parse the JSON response from the API. Error: {e}", file=sys.stderr)
+        return {}
+    except Exception as e:
+        print(f"An unexpected error occurred during AI resolution: {e}", file=sys.stderr)
+        return {}
+
+async def resolve_batches_async(api_url, batches):
+    http2 = importlib.util.find_spec('h2') is not None
+    limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+    async with httpx.AsyncClient(http2=http2, timeout=LLM_TIMEOUT, limits=limits) as client:
+        return await asyncio.gather(*[resolve_batch_async(client, api_url, batch) for batch in batches])
+
+def _in_event_loop():
+    # asyncio.run() cannot be nested, e.g. when called from Jupyter or IPython.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def resolve_imports_with_llm(modules_to_resolve, api_key):
+    """
+    Uses the Gemini API to find the pip package names for a list of import names.
+    Large lists are split into batches that are sent concurrently.
+    """
+    if not modules_to_resolve:
+        return {}
+    if not api_key:
+        print("\nWarning: No API key provided. Skipping AI resolution.", file=sys.stderr)
+        return {}
+        
+    print(f"\nAttempting to resolve {len(modules_to_resolve)} modules with AI: {', '.join(modules_to_resolve)}")
+    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
 
-class ImportVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.imports = set()
+    modules = sorted(modules_to_resolve)
+    batches = [modules[i:i + LLM_BATCH_SIZE] for i in range(0, len(modules), LLM_BATCH_SIZE)]
+    if httpx is not None and not _in_event_loop():
+        results = asyncio.run(resolve_batches_async(api_url, batches))
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(batches), LLM_MAX_CONNECTIONS)) as executor:
+            results = list(executor.map(partial(resolve_batch, api_url), batches))
 
-    def visit_Import(self, node):
-        for alias in node.names:
-            self.imports.add(alias.name.split('.')[0])
-        self.generic_visit(node)
+    llm_mappings = {}
+    for mapping in results:
+        llm_mappings.update(mapping)
+    if llm_mappings:
+        print("AI resolution successful.")
+    return llm_mappings
 
-    def visit_ImportFrom(self, node):
-        if node.module:
-            self.imports.add(node.module.split('.')[0])
-        self.generic_visit(node)
+# --- Core Logic ---
 
-def get_imports_from_code(code):
-    try:
-        tree = ast.parse(code)
-        visitor = ImportVisitor()
-        visitor.visit(tree)
-        return visitor.imports
-    except SyntaxError as e:
-        print(f"Warning: Skipping a code block due to syntax error: {e}", file=sys.stderr)
-        return set()
+# The file parsers return None when a file could not be read, so that the
+# failure is not cached as "no imports" and the file is retried next run.
 
 def get_imports_from_py(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
-        return get_imports_from_code(code)
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if _IMPORT_RE.search(data) is None:
+            return []
+        return get_imports_from_code(data.decode('utf-8', errors='ignore'))
     except Exception as e:
         print(f"Error reading file {file_path}: {e}", file=sys.stderr)
-        return set()
+        return None
+
+def _drop_outputs(obj):
+    # Cell outputs (images, logs) are never needed, so don't keep them around.
+    obj.pop('outputs', None)
+    return obj
+
+def _stream_code_cells(file_path):
+    # Collected into a list, so that a lexing error part-way through leaves
+    # nothing half-yielded before the lenient fallback runs.
+    cells = []
+    with open(file_path, 'rb') as f:
+        cell_type, source = None, []
+        for prefix, event, value in ijson.parse(f):
+            if prefix == 'cells.item.cell_type':
+                cell_type = value
+            elif prefix == 'cells.item.source.item' or (prefix == 'cells.item.source' and event == 'string'):
+                source.append(value)
+            elif prefix == 'cells.item' and event == 'end_map':
+                if cell_type == 'code':
+                    cells.append("".join(source))
+                cell_type, source = None, []
+    return cells
+
+def iter_code_cells(file_path):
+    """
+    Yields the source of each code cell in a notebook. With ijson installed the
+    notebook is streamed, so outputs are skipped over instead of materialized.
+    Notebooks that are not valid UTF-8 are decoded leniently, ignoring bad bytes.
+    """
+    if ijson is not None:
+        try:
+            yield from _stream_code_cells(file_path)
+            return
+        except ijson.JSONError:
+            # Invalid UTF-8 (or broken JSON): retry below with lenient decoding.
+            pass
+
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    notebook = None
+    if orjson is not None:
+        try:
+            notebook = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects invalid UTF-8 outright; decode leniently instead.
+            pass
+    if notebook is None:
+        notebook = json.loads(data.decode('utf-8', errors='ignore'), object_hook=_drop_outputs)
+    for cell in notebook.get('cells', []):
+        if cell.get('cell_type') == 'code':
+            source = cell.get('source', '')
+            yield "".join(source) if isinstance(source, list) else source
 
 def get_imports_from_ipynb(file_path):
-    imports = set()
+    imports = []
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            notebook = json.load(f)
-        code_cells = [cell['source'] for cell in notebook.get('cells', []) if cell.get('cell_type') == 'code']
-        for cell_source in code_cells:
-            full_source = "".join(cell_source)
-            imports.update(get_imports_from_code(full_source))
+        for cell_source in iter_code_cells(file_path):
+            imports.extend(get_imports_from_code(cell_source))
     except Exception as e:
         print(f"Error processing notebook {file_path}: {e}", file=sys.stderr)
+        return None
     return imports
 
+# Below this many files, starting worker processes costs more than it saves.
+PARALLEL_PARSE_THRESHOLD = 32
+
+PARSERS = {'.py': get_imports_from_py, '.ipynb': get_imports_from_ipynb}
+SOURCE_SUFFIXES = tuple(PARSERS)
+
+def _parse_one(file_path, suffix):
+    """Collects the imports of a single source file; runs in a worker process."""
+    return PARSERS[suffix](file_path)
+
+def get_top_level_modules(dist):
+    """
+    Returns the top-level module names provided by an installed distribution.
+    """
+    top_level = dist.read_text('top_level.txt')
+    if top_level is not None:
+        return top_level.split()
+    # Wheels built without top_level.txt only list their installed files.
+    modules = set()
+    for path in dist.files or ():
+        if len(path.parts) > 1:
+            module = path.parts[0]
+        else:
+            module = inspect.getmodulename(path.name)
+        if module and module.isidentifier():
+            modules.add(module)
+    return modules
+
+def normalize_name(name):
+    """Normalizes a distribution name as pip does (PEP 503), e.g. 'Foo_Bar' -> 'foo-bar'."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
 def get_distribution_packages():
-    mapping = {}
+    """
+    Builds the module -> package and package -> version maps in a single pass
+    over the installed distributions. The version map is keyed by normalized name.
+    """
+    module_map = {}
+    version_map = {}
     try:
-        dist_map = metadata.packages_distributions()
-        for package, modules in dist_map.items():
-            for module in modules:
-                mapping[module] = package
+        for dist in metadata.distributions():
+            dist_metadata = dist.metadata
+            package = dist_metadata['Name']
+            if not package:
+                continue
+            key = normalize_name(package)
+            if key in version_map:
+                continue
+            version_map[key] = dist_metadata['Version']
+            for module in get_top_level_modules(dist):
+                module_map.setdefault(module, package)
     except Exception as e:
         print(f"Warning: Could not automatically map all distributions. {e}", file=sys.stderr)
-    return mapping
+    return module_map, version_map
 
-def run(project_path, api_key):
-    """Main function to scan directory, find imports, and generate requirements.txt."""
-    print(f"Starting scan in '{project_path}'...")
-    all_imports = set()
+# --- Caching ---
+
+# Bump whenever the scanner changes what it reports, to invalidate old caches.
+CACHE_VERSION = 2
+
+def get_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'ai-reqs')
+
+def get_project_cache_path(project_root):
+    digest = hashlib.sha1(project_root.encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(), f"{digest}.json")
+
+def new_cache():
+    return {'version': CACHE_VERSION, 'files': {}, 'unresolvable': []}
 
-    for root, _, files in os.walk(project_path):
-        if any(d in root for d in ['venv', 'env', '.git', '.ipynb_checkpoints']):
-            continue
+def load_cache(cache_path):
+    """
+    Loads a project cache holding {path: [mtime_ns, size, imports]} for scanned
+    files and the modules the AI could not map to a package (usually the
+    project's own modules). Returns an empty cache if none is usable.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = json_loads(f.read())
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return new_cache()
+
+def get_llm_map_path():
+    return os.path.join(get_cache_dir(), 'llm_map.json')
+
+def load_llm_map():
+    """
+    Loads the {import_name: package_name} mappings the AI has resolved before.
+    Unlike the scan cache, this map is shared by every project.
+    """
+    try:
+        with open(get_llm_map_path(), 'rb') as f:
+            llm_map = json_loads(f.read())
+        if isinstance(llm_map, dict):
+            return llm_map
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def save_cache(cache_path, cache):
+    """Writes the cache atomically, so an interrupted run never leaves it corrupt."""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps(cache))
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write the cache to {cache_path}. {e}", file=sys.stderr)
+
+def parse_files(paths, suffixes):
+    """
+    Returns the imports of each file. Reading and parsing each file is independent
+    work, and ast.parse holds the GIL, so larger batches are spread across processes.
+    """
+    if len(paths) >= PARALLEL_PARSE_THRESHOLD:
+        try:
+            # The default worker count respects the platform's limits (61 on Windows).
+            with ProcessPoolExecutor() as executor:
+                return list(executor.map(_parse_one, paths, suffixes, chunksize=16))
+        except (BrokenProcessPool, OSError, NotImplementedError) as e:
+            print(f"Warning: Could not parse files in parallel, continuing serially. {e}", file=sys.stderr)
+    return list(map(_parse_one, paths, suffixes))
+
+def collect_imports(project_root, cached_files):
+    """
+    Walks the project and returns every import name found, along with the updated
+    file cache. Files whose mtime and size match the cache are not reopened.
+    """
+    # Parsers return plain lists; names are deduplicated once, at the end.
+    imports_list = []
+    scanned_files = {}
+    source_files = []
+    for root, dirs, files in os.walk(project_root):
+        # Prune in place so os.walk never descends into these directories.
+        if 'pyvenv.cfg' in files:
+            if root != project_root:
+                # A virtualenv (e.g. venv311, .venv-3.12): skip it and everything below.
+                dirs[:] = []
+                continue
+            # The project itself is a virtualenv ("python -m venv ."): only skip
+            # the environment's own directories.
+            dirs[:] = [d for d in dirs if d not in VENV_DIRS]
+        dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
         for file in files:
-            file_path = os.path.join(root, file)
-            if file.endswith('.py'):
-                all_imports.update(get_imports_from_py(file_path))
-            elif file.endswith('.ipynb'):
-                all_imports.update(get_imports_from_ipynb(file_path))
+            if not file.endswith(SOURCE_SUFFIXES):
+                continue
+            # os.walk already yields normalized roots, so skip os.path.join.
+            file_path = f"{root}{os.sep}{file}"
+            try:
+                st = os.stat(file_path)
+            except OSError as e:
+                print(f"Error reading file {file_path}: {e}", file=sys.stderr)
+                continue
+            cached = cached_files.get(file_path)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                scanned_files[file_path] = cached
+                imports_list.extend(cached[2])
+            else:
+                source_files.append((file_path, file[file.rindex('.'):], st))
+
+    if source_files:
+        paths = [path for path, _, _ in source_files]
+        suffixes = [suffix for _, suffix, _ in source_files]
+        results = parse_files(paths, suffixes)
+        for (file_path, _, st), imports in zip(source_files, results):
+            if imports is None:
+                continue
+            scanned_files[file_path] = [st.st_mtime_ns, st.st_size, imports]
+            imports_list.extend(imports)
+    return set(imports_list), scanned_files
+
+def run(project_path, api_key, use_cache=True):
+    """Main function to scan directory, find imports, and generate requirements.txt."""
+    print(f"Starting scan in '{project_path}'...")
+    project_root = os.path.abspath(project_path)
+    cache_path = get_project_cache_path(project_root)
+    cache = load_cache(cache_path) if use_cache else new_cache()
+    all_imports, cache['files'] = collect_imports(project_root, cache['files'])
 
     print(f"\nScan complete. Found {len(all_imports)} potential imports.")
-    external_imports = sorted(list(all_imports - STANDARD_LIBRARIES))
+    external_imports = sorted(all_imports - STANDARD_LIBRARIES)
     print(f"Found {len(external_imports)} external modules to resolve.")
 
-    module_to_package_map = get_distribution_packages()
+    module_to_package_map, version_map = get_distribution_packages()
     requirements = set()
     unresolved_modules = set()
 
@@ -170,15 +490,36 @@ def run(project_path, api_key):
         package_name = module_to_package_map.get(module_name)
         if package_name:
             requirements.add(package_name)
+        elif normalize_name(module_name) in version_map:
+            requirements.add(module_name)
         else:
             try:
-                metadata.version(module_name)
+                version_map[normalize_name(module_name)] = metadata.version(module_name)
                 requirements.add(module_name)
             except metadata.PackageNotFoundError:
                 unresolved_modules.add(module_name)
     
     if unresolved_modules:
-        llm_mappings = resolve_imports_with_llm(unresolved_modules, api_key)
+        # Only ask the AI about modules it has not already answered for before:
+        # packages come from the shared map, and modules it mapped to null
+        # (typically local modules) from this project's cache.
+        llm_map = load_llm_map() if use_cache else {}
+        llm_mappings = {module: llm_map[module] for module in unresolved_modules if module in llm_map}
+        unresolvable = set(cache.get('unresolvable', ())) & unresolved_modules
+        llm_mappings.update(dict.fromkeys(unresolvable - llm_mappings.keys()))
+        remaining_modules = unresolved_modules - llm_mappings.keys()
+        if remaining_modules:
+            new_mappings = resolve_imports_with_llm(remaining_modules, api_key)
+            llm_mappings.update(new_mappings)
+            resolved = {module: package for module, package in new_mappings.items()
+                        if package and module in remaining_modules}
+            if use_cache and resolved:
+                llm_map.update(resolved)
+                save_cache(get_llm_map_path(), llm_map)
+            # Only explicit null answers are remembered; failed requests are retried.
+            unresolvable.update(module for module, package in new_mappings.items()
+                                if package is None and module in remaining_modules)
+        cache['unresolvable'] = sorted(unresolvable)
         still_unresolved = set()
         for module, package in llm_mappings.items():
             if package:
@@ -188,27 +529,38 @@ def run(project_path, api_key):
                 still_unresolved.add(module)
         unresolved_modules = still_unresolved
 
+    if use_cache:
+        save_cache(cache_path, cache)
+
     if not requirements:
         print("\nNo external packages found. requirements.txt will not be created.")
         return
 
     output_lines = []
     print("\nGenerating requirements.txt with versions...")
-    for package in sorted(list(requirements)):
-        try:
-            version = metadata.version(package)
-            line = f"{package}=={version}"
-            print(f"  - Found: {line}")
-            output_lines.append(line)
-        except metadata.PackageNotFoundError:
-            print(f"  - Warning: Could not find version for '{package}'. It may be a namespace package or part of another.", file=sys.stderr)
+    for package in sorted(requirements):
+        version = version_map.get(normalize_name(package))
+        if version is None:
+            try:
+                version = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                print(f"  - Warning: Could not find version for '{package}'. It may be a namespace package or part of another.", file=sys.stderr)
+                continue
+        line = f"{package}=={version}"
+        print(f"  - Found: {line}")
+        output_lines.append(line)
 
     output_path = os.path.join(project_path, 'requirements.txt')
+    payload = ("# Generated by AI-Reqs\n" + "\n".join(output_lines) + "\n").encode('utf-8')
     try:
-        with open(output_path, 'w') as f:
-            f.write("# Generated by AI-Reqs\n")
-            f.write("\n".join(output_lines))
-            f.write("\n")
+        fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # os.write() may write less than asked (e.g. on a nearly full disk).
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
         print(f"\nSuccessfully created {output_path}!")
     except IOError as e:
         print(f"\nError: Could not write to {output_path}. {e}", file=sys.stderr)
@@ -235,6 +587,11 @@ def main():
         default=os.environ.get('GEMINI_API_KEY'),
         help='Your Gemini API key. Can also be set via the GEMINI_API_KEY environment variable.'
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Rescan every file and re-query the AI instead of reusing cached results.'
+    )
     args = parser.parse_args()
     
     if not args.api_key:
@@ -242,7 +599,7 @@ def main():
         print("Please provide it using the --api-key argument or by setting the GEMINI_API_KEY environment variable.", file=sys.stderr)
         sys.exit(1)
         
-    run(args.path, args.api_key)
+    run(args.path, args.api_key, use_cache=not args.no_cache)
 
 if __name__ == "__main__":
     main()
@@ -1,32 +1,9 @@
-# A list of Python's standard libraries.
-STANDARD_LIBRARIES = {
-    'abc', 'aifc', 'argparse', 'array', 'ast', 'asynchat', 'asyncio',
-    'asyncore', 'atexit', 'audioop', 'base64', 'bdb', 'binascii', 'binhex',
-    'bisect', 'builtins', 'bz2', 'calendar', 'cgi', 'cgitb', 'chunk', 'cmath',
-    'cmd', 'code', 'codecs', 'codeop', 'collections', 'colorsys', 'compileall',
-    'concurrent', 'configparser', 'contextlib', 'contextvars', 'copy',
-    'copyreg', 'cProfile', 'crypt', 'csv', 'ctypes', 'curses', 'dataclasses',
-    'datetime', 'dbm', 'decimal', 'difflib', 'dis', 'distutils', 'doctest',
-    'email', 'encodings', 'ensurepip', 'enum', 'errno', 'faulthandler', 'fcntl',
-    'filecmp', 'fileinput', 'fnmatch', 'formatter', 'fractions', 'ftplib',
-    'functools', 'gc', 'getopt', 'getpass', 'gettext', 'glob', 'graphlib',
-    'grp', 'gzip', 'hashlib', 'heapq', 'hmac', 'html', 'http', 'imaplib',
-    'imghdr', 'imp', 'importlib', 'inspect', 'io', 'ipaddress', 'itertools',
-    'json', 'keyword', 'lib2to3', 'linecache', 'locale', 'logging', 'lzma',
-    'mailbox', 'mailcap', 'marshal', 'math', 'mimetypes', 'mmap', 'modulefinder',
-    'multiprocessing', 'netrc', 'nis', 'nntplib', 'numbers', 'operator', 'optparse',
-    'os', 'ossaudiodev', 'parser', 'pathlib', 'pdb', 'pickle', 'pickletools',
-    'pipes', 'pkgutil', 'platform', 'plistlib', 'poplib', 'posix', 'pprint',
-    'profile', 'pstats', 'pty', 'pwd', 'py_compile', 'pyclbr', 'pydoc', 'queue',
-    'quopri', 'random', 're', 'readline', 'reprlib', 'resource', 'rlcompleter',
-    'runpy', 'sched', 'secrets', 'select', 'selectors', 'shelve', 'shlex',
-    'shutil', 'signal', 'site', 'smtpd', 'smtplib', 'sndhdr', 'socket',
-    'socketserver', 'spwd', 'sqlite3', 'ssl', 'stat', 'statistics', 'string',
-    'stringprep', 'struct', 'subprocess', 'sunau', 'symtable', 'sys',
-    'sysconfig', 'syslog', 'tabnanny', 'tarfile', 'telnetlib', 'tempfile',
-    'termios', 'textwrap', 'threading', 'time', 'timeit', 'tkinter', 'token',
-    'tokenize', 'trace', 'traceback', 'tracemalloc', 'tty', 'turtle', 'turtledemo',
-    'types', 'typing', 'unicodedata', 'unittest', 'urllib', 'uu', 'uuid',
-    'venv', 'warnings', 'wave', 'weakref', 'webbrowser', 'wsgiref', 'xdrlib',
-    'xml', 'xmlrpc', 'zipapp', 'zipfile', 'zipimport', 'zlib', 'zoneinfo'
-}
\ No newline at end of file
+import sys
+
+# Python's standard libraries. Python 3.10+ ships the authoritative list for the
+# running interpreter; older versions fall back to the list in _stdlib_data,
+# which is only imported when needed.
+if hasattr(sys, 'stdlib_module_names'):
+    STANDARD_LIBRARIES = sys.stdlib_module_names
+else:
+    from ._stdlib_data import STDLIB as STANDARD_LIBRARIES
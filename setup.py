@@ -0,0 +1,18 @@
+# Project metadata lives in pyproject.toml. This file only adds an optional
+# mypyc-compiled build of the import scanner (requires mypy to be installed):
+#
+#     AI_REQS_USE_MYPYC=1 pip install --no-build-isolation .
+#
+# Without the variable a pure-Python package is built.
+import os
+
+from setuptools import setup
+
+ext_modules = []
+if os.environ.get("AI_REQS_USE_MYPYC") == "1":
+    from mypyc.build import mypycify
+
+    # ai_reqs_generator has no __init__.py, so tell mypy where the package root is.
+    ext_modules = mypycify(["--explicit-package-bases", "ai_reqs_generator/_visitor.py"])
+
+setup(ext_modules=ext_modules)